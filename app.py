@@ -1,15 +1,57 @@
 """
 Streamlit app for forecast monitoring agent.
 """
+import os
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-from modules.loader import load_data, get_item_data, get_all_item_ids, get_recent_actuals, get_early_forecast
-from modules.diagnostics import run_all_diagnostics
-from modules.visualizer import plot_forecast_analysis, create_summary_stats_table
-from modules.explainer import prepare_analysis_summary, generate_explanation, format_explanation_report
+from modules.loader import (load_data, get_all_item_ids,
+                            build_item_matrix, get_item_data_from_matrix)
+from modules.diagnostics import run_all_diagnostics_matrix
+from modules.visualizer import render_forecast_png, create_summary_stats_table_cached
+from modules.explainer import get_issue_flags, generate_mock_explanation_flags, format_explanation_report
 from modules.reporter import create_detailed_report
 
+DATA_PATH = "data/data.csv"
+
+
+# Every cached function takes the data file's modification time as part of
+# its key, so editing the file invalidates all of them on the next rerun.
+# Only the current version of the per-file resources is kept.
+@st.cache_data(show_spinner=False, max_entries=1)
+def cached_load_data(file_path: str, data_mtime: float) -> pd.DataFrame:
+    """Parse the data file once instead of on every rerun."""
+    return load_data(file_path)
+
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def cached_item_ids(file_path: str, data_mtime: float) -> list:
+    """Unique item ids of the data file."""
+    return get_all_item_ids(cached_load_data(file_path, data_mtime))
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def cached_item_matrix(file_path: str, data_mtime: float) -> tuple:
+    """Item index and history/forecast matrices, shared read-only across reruns."""
+    return build_item_matrix(cached_load_data(file_path, data_mtime))
+
+
+@st.cache_resource(show_spinner="Running diagnostics...", max_entries=1)
+def cached_all_diagnostics(file_path: str, data_mtime: float) -> dict:
+    """Diagnostics for every item, computed in one batch per data file."""
+    item_index, hist_matrix, fcst_matrix = cached_item_matrix(file_path, data_mtime)
+    all_results = run_all_diagnostics_matrix(hist_matrix, fcst_matrix)
+    return {item_loc_id: all_results[row] for item_loc_id, row in item_index.items()}
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def cached_forecast_png(file_path: str, data_mtime: float, item_loc_id: str) -> bytes:
+    """Rendered analysis plot of one item, so reselecting it skips Matplotlib."""
+    item_index, hist_matrix, fcst_matrix = cached_item_matrix(file_path, data_mtime)
+    historical_data, forecast_data = get_item_data_from_matrix(item_index, hist_matrix, fcst_matrix,
+                                                               item_loc_id)
+    diagnostics = cached_all_diagnostics(file_path, data_mtime)[item_loc_id]
+    return render_forecast_png(historical_data, forecast_data, diagnostics, item_loc_id)
+
 
 def main():
     st.set_page_config(page_title="Forecast Monitor Agent", layout="wide")
@@ -19,24 +61,26 @@ def main():
     
     # Load data
     try:
-        df = load_data("data/data.csv")
-        item_ids = get_all_item_ids(df)
+        data_mtime = os.path.getmtime(DATA_PATH)
+        item_ids = cached_item_ids(DATA_PATH, data_mtime)
+        item_index, hist_matrix, fcst_matrix = cached_item_matrix(DATA_PATH, data_mtime)
+        all_diagnostics = cached_all_diagnostics(DATA_PATH, data_mtime)
         
         st.sidebar.header("Configuration")
         selected_item = st.sidebar.selectbox("Select Item ID", item_ids)
         
         if selected_item:
             # Load item data
-            historical_data, forecast_data = get_item_data(df, selected_item)
-            recent_actuals = get_recent_actuals(historical_data)
-            early_forecast = get_early_forecast(forecast_data)
+            historical_data, forecast_data = get_item_data_from_matrix(item_index, hist_matrix, fcst_matrix,
+                                                                       selected_item)
             
-            # Run diagnostics
-            diagnostics = run_all_diagnostics(historical_data, forecast_data, recent_actuals, early_forecast)
+            # Look up precomputed diagnostics (None if the item has no history or no forecast)
+            diagnostics = all_diagnostics[selected_item]
+            if diagnostics is None:
+                raise ValueError(f"{selected_item} needs both historical and forecast months to be diagnosed")
             
             # Create explanation
-            analysis_summary = prepare_analysis_summary(selected_item, diagnostics, historical_data, forecast_data)
-            explanation = generate_explanation(analysis_summary, use_mock=True)
+            explanation = generate_mock_explanation_flags(get_issue_flags(diagnostics))
             report = format_explanation_report(selected_item, diagnostics, explanation)
             
             # Display results
@@ -45,14 +89,13 @@ def main():
             with col1:
                 st.subheader("📊 Time Series Analysis")
                 
-                # Create and display plot
-                fig = plot_forecast_analysis(historical_data, forecast_data, diagnostics, selected_item)
-                st.pyplot(fig)
-                plt.close()
+                # Display the cached plot; it is wider than the column, so it
+                # is scaled down to the column width
+                st.image(cached_forecast_png(DATA_PATH, data_mtime, selected_item))
                 
                 # Summary statistics
                 st.subheader("📈 Summary Statistics")
-                stats_df = create_summary_stats_table(historical_data, forecast_data)
+                stats_df = create_summary_stats_table_cached(historical_data, forecast_data)
                 st.dataframe(stats_df, use_container_width=True)
             
             with col2:
@@ -101,9 +144,9 @@ def main():
             # Data preview (expandable)
             with st.expander("📋 Data Preview"):
                 st.write("**Historical Data (last 10 months):**")
-                st.write(historical_data.tail(10))
+                st.write(historical_data[-10:])
                 st.write("**Forecast Data (first 10 months):**")
-                st.write(forecast_data.head(10))
+                st.write(forecast_data[:10])
     
     except FileNotFoundError:
         st.error("Data file not found. Please ensure 'data/data.csv' exists.")
@@ -1,30 +1,48 @@
 """
 Diagnostic functions to detect forecast issues.
 """
+from functools import lru_cache
 import pandas as pd
 import numpy as np
-from typing import Dict, Tuple
-from scipy import stats
-from scipy.fft import fft
+from typing import Dict, List, Tuple
+from scipy.fft import rfft
+from modules.diagnostics_jit import (NUMBA_AVAILABLE, _slope_kernel, _r_squared_kernel, _vol_kernel,
+                                     _mag_kernel, _seasonal_strength_kernel)
+from modules.issues import ISSUE_KEYS
+
+# _seasonal_strength_kernel evaluates every DFT bin in O(n²); it beats the
+# O(n log n) rfft up to about this many points
+_SEASONAL_KERNEL_MAX_POINTS = 96
 
 
 def detect_trend_mismatch(historical_data: pd.Series, forecast_data: pd.Series) -> Dict:
     """
     Detect if forecast trend contradicts historical trend.
+    
+    The R-squared values are only computed when the trends disagree and are
+    NaN otherwise.
     """
-    # Calculate historical trend using linear regression
-    hist_x = np.arange(len(historical_data))
-    hist_slope, _, hist_r_value, _, _ = stats.linregress(hist_x, historical_data.values)
+    slope = _slope_kernel if NUMBA_AVAILABLE else _fast_slope
+    r_squared = _r_squared_kernel if NUMBA_AVAILABLE else _fast_r_squared
+    hist = np.asarray(historical_data, dtype=np.float64)
+    forecast = np.asarray(forecast_data, dtype=np.float64)
     
-    # Calculate forecast trend
-    forecast_x = np.arange(len(forecast_data))
-    forecast_slope, _, forecast_r_value, _, _ = stats.linregress(forecast_x, forecast_data.values)
+    # Calculate historical and forecast trends using linear regression
+    hist_slope = slope(hist)
+    forecast_slope = slope(forecast)
     
     # Check if trends are in opposite directions
     trend_mismatch = (hist_slope > 0 and forecast_slope < 0) or (hist_slope < 0 and forecast_slope > 0)
     
-    # Calculate confidence based on R-squared values
-    confidence = min(abs(hist_r_value), abs(forecast_r_value)) if trend_mismatch else 0
+    # Calculate confidence based on R-squared values; it is 0 unless the
+    # trends disagree, which most items don't, so skip the fit quality then
+    if trend_mismatch:
+        hist_r_squared = r_squared(hist)
+        forecast_r_squared = r_squared(forecast)
+        confidence = np.sqrt(min(hist_r_squared, forecast_r_squared))
+    else:
+        hist_r_squared = forecast_r_squared = np.nan
+        confidence = 0
     
     return {
         'detected': trend_mismatch,
@@ -33,8 +51,8 @@ def detect_trend_mismatch(historical_data: pd.Series, forecast_data: pd.Series)
         'forecast_trend': 'increasing' if forecast_slope > 0 else 'decreasing',
         'hist_slope': hist_slope,
         'forecast_slope': forecast_slope,
-        'hist_r_squared': hist_r_value**2,
-        'forecast_r_squared': forecast_r_value**2
+        'hist_r_squared': hist_r_squared,
+        'forecast_r_squared': forecast_r_squared
     }
 
 
@@ -42,16 +60,9 @@ def detect_missing_seasonality(historical_data: pd.Series, forecast_data: pd.Ser
     """
     Detect if forecast misses clear seasonality present in historical data.
     """
-    # Calculate seasonality strength in historical data using FFT
-    hist_fft = np.abs(fft(historical_data.values))
-    # Focus on 12-month cycle (annual seasonality)
-    seasonal_freq_index = len(hist_fft) // 12 if len(hist_fft) >= 12 else 1
-    hist_seasonal_strength = hist_fft[seasonal_freq_index] / np.mean(hist_fft[1:])
-    
-    # Calculate seasonality in forecast
-    forecast_fft = np.abs(fft(forecast_data.values))
-    forecast_seasonal_freq_index = len(forecast_fft) // 12 if len(forecast_fft) >= 12 else 1
-    forecast_seasonal_strength = forecast_fft[forecast_seasonal_freq_index] / np.mean(forecast_fft[1:])
+    # Strength of the 12-month cycle (annual seasonality)
+    hist_seasonal_strength = _series_seasonal_strength(np.asarray(historical_data, dtype=np.float64))
+    forecast_seasonal_strength = _series_seasonal_strength(np.asarray(forecast_data, dtype=np.float64))
     
     # Detect missing seasonality
     seasonality_threshold = 1.5  # Threshold for significant seasonality
@@ -75,9 +86,19 @@ def detect_volatility_mismatch(historical_data: pd.Series, forecast_data: pd.Ser
     """
     Detect if forecast is too flat compared to historical volatility.
     """
+    hist = np.asarray(historical_data, dtype=np.float64)
+    forecast = np.asarray(forecast_data, dtype=np.float64)
+    
     # Calculate coefficient of variation (CV) for both series
-    hist_cv = historical_data.std() / historical_data.mean() if historical_data.mean() != 0 else 0
-    forecast_cv = forecast_data.std() / forecast_data.mean() if forecast_data.mean() != 0 else 0
+    if NUMBA_AVAILABLE:
+        hist_cv = _vol_kernel(hist)
+        forecast_cv = _vol_kernel(forecast)
+    else:
+        # ddof=1 matches pandas' Series.std
+        hist_mean = hist.mean()
+        forecast_mean = forecast.mean()
+        hist_cv = hist.std(ddof=1) / hist_mean if hist_mean != 0 else 0
+        forecast_cv = forecast.std(ddof=1) / forecast_mean if forecast_mean != 0 else 0
     
     # Detect if forecast is significantly less volatile
     volatility_ratio = forecast_cv / hist_cv if hist_cv != 0 else 1
@@ -96,18 +117,24 @@ def detect_volatility_mismatch(historical_data: pd.Series, forecast_data: pd.Ser
     }
 
 
-def detect_magnitude_mismatch(recent_actuals: pd.Series, early_forecast: pd.Series) -> Dict:
+def detect_magnitude_mismatch(recent_actuals: np.ndarray, early_forecast: np.ndarray) -> Dict:
     """
     Detect if early forecast magnitude is too far off from recent actuals.
     """
-    recent_mean = recent_actuals.mean()
-    forecast_mean = early_forecast.mean()
+    recent = np.asarray(recent_actuals, dtype=np.float64)
+    forecast = np.asarray(early_forecast, dtype=np.float64)
     
-    # Calculate percentage difference
-    if recent_mean != 0:
-        pct_diff = abs(forecast_mean - recent_mean) / recent_mean
+    if NUMBA_AVAILABLE:
+        recent_mean, forecast_mean, pct_diff = _mag_kernel(recent, forecast)
     else:
-        pct_diff = float('inf') if forecast_mean != 0 else 0
+        recent_mean = recent.mean()
+        forecast_mean = forecast.mean()
+        
+        # Calculate percentage difference
+        if recent_mean != 0:
+            pct_diff = abs(forecast_mean - recent_mean) / recent_mean
+        else:
+            pct_diff = float('inf') if forecast_mean != 0 else 0
     
     # Threshold for significant magnitude difference
     threshold = 0.5  # 50% difference
@@ -126,10 +153,17 @@ def detect_magnitude_mismatch(recent_actuals: pd.Series, early_forecast: pd.Seri
 
 
 def run_all_diagnostics(historical_data: pd.Series, forecast_data: pd.Series, 
-                       recent_actuals: pd.Series, early_forecast: pd.Series) -> Dict:
+                       recent_actuals: np.ndarray, early_forecast: np.ndarray) -> Dict:
     """
     Run all diagnostic tests and return combined results.
     """
+    if NUMBA_AVAILABLE:
+        # Convert once so every compiled kernel gets a float64 array
+        historical_data, forecast_data, recent_actuals, early_forecast = (
+            np.ascontiguousarray(data, dtype=np.float64)
+            for data in (historical_data, forecast_data, recent_actuals, early_forecast)
+        )
+    
     results = {
         'trend_mismatch': detect_trend_mismatch(historical_data, forecast_data),
         'missing_seasonality': detect_missing_seasonality(historical_data, forecast_data),
@@ -138,13 +172,247 @@ def run_all_diagnostics(historical_data: pd.Series, forecast_data: pd.Series,
     }
     
     # Calculate overall risk score
-    detected_issues = sum(1 for result in results.values() if result['detected'])
-    avg_confidence = np.mean([result['confidence'] for result in results.values() if result['detected']])
+    detected = np.array([results[key]['detected'] for key in ISSUE_KEYS], dtype=bool)
+    confidences = np.array([results[key]['confidence'] for key in ISSUE_KEYS], dtype=np.float64)
+    detected_issues = int(detected.sum())
+    avg_confidence = confidences[detected].mean() if detected_issues > 0 else 0
     
     results['summary'] = {
         'total_issues': detected_issues,
-        'avg_confidence': avg_confidence if detected_issues > 0 else 0,
-        'risk_score': detected_issues * avg_confidence if detected_issues > 0 else 0
+        'avg_confidence': avg_confidence,
+        'risk_score': detected_issues * avg_confidence
+    }
+    
+    return results
+
+
+@lru_cache(maxsize=8)
+def _xstats(n: int) -> Tuple[np.ndarray, float]:
+    """
+    Centered regression x-vector (0..n-1 minus its mean) and its sum of
+    squares. Series come in a handful of fixed lengths, so these are built
+    once per length.
+    """
+    x = np.arange(n, dtype=np.float64)
+    dx = x - x.mean()
+    dx.flags.writeable = False
+    return dx, dx @ dx
+
+
+@lru_cache(maxsize=8)
+def _spectrum_weights(n: int) -> np.ndarray:
+    """
+    Weights that turn the rfft bins 1..n//2 of a length-n series into the sum
+    over all non-DC bins of the full spectrum: every bin except (for even n)
+    Nyquist appears twice.
+    """
+    weights = np.full(n // 2, 2.0)
+    if n % 2 == 0:
+        weights[-1] = 1.0
+    weights.flags.writeable = False
+    return weights
+
+
+def _fast_slope(y: np.ndarray) -> np.ndarray:
+    """
+    Closed-form least-squares slope of y against its index, computed along
+    the last axis (works for 1D and 2D input).
+    """
+    dx, sxx = _xstats(y.shape[-1])
+    dy = y - y.mean(axis=-1, keepdims=True)
+    return (dy @ dx) / sxx
+
+
+def _fast_r_squared(y: np.ndarray) -> np.ndarray:
+    """
+    R-squared of the least-squares line of y against its index, computed
+    along the last axis (works for 1D and 2D input).
+    """
+    dx, sxx = _xstats(y.shape[-1])
+    dy = y - y.mean(axis=-1, keepdims=True)
+    
+    sxy = dy @ dx
+    syy = (dy * dy).sum(axis=-1)
+    
+    # Flat series have no linear relationship; report r² = 0 rather than NaN
+    denom = sxx * syy
+    r_squared = np.divide(sxy * sxy, denom, out=np.zeros_like(denom), where=denom > 0)
+    # [()] unwraps 0-d results so 1D input yields plain scalars
+    return np.minimum(r_squared, 1.0)[()]
+
+
+def _seasonal_strength(values: np.ndarray) -> np.ndarray:
+    """
+    Magnitude of the 12-month FFT bin relative to the mean magnitude of all
+    non-DC bins, computed along the last axis.
+    """
+    n = values.shape[-1]
+    spectrum = np.abs(rfft(values, axis=-1, workers=-1))
+    seasonal_freq_index = n // 12 if n >= 12 else 1
+    
+    mean_magnitude = (spectrum[..., 1:] @ _spectrum_weights(n)) / (n - 1)
+    
+    # A constant series has no non-DC content; any nonzero bins are FFT
+    # rounding noise, so report zero seasonal strength
+    flat = (values == values[..., :1]).all(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        strength = spectrum[..., seasonal_freq_index] / mean_magnitude
+    return np.where(flat, 0.0, strength)[()]
+
+
+def _series_seasonal_strength(values: np.ndarray) -> float:
+    """
+    Seasonal strength of a single series: the compiled kernel for short
+    series, the real FFT otherwise.
+    """
+    if NUMBA_AVAILABLE and len(values) <= _SEASONAL_KERNEL_MAX_POINTS:
+        return _seasonal_strength_kernel(values)
+    return _seasonal_strength(values)
+
+
+def run_all_diagnostics_batch(hist: np.ndarray, fcst: np.ndarray, months: int = 6) -> Dict:
+    """
+    Run all diagnostic tests for many items in one vectorized pass.
+    
+    hist and fcst are 2D arrays of shape (n_items, n_months) holding one item
+    per row. Returns the same structure as run_all_diagnostics, with every
+    per-item value replaced by an array of length n_items. Use
+    get_item_diagnostics to slice out a single item.
+    """
+    hist = np.asarray(hist, dtype=np.float64)
+    fcst = np.asarray(fcst, dtype=np.float64)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Trend mismatch; R-squared is only computed for the rows whose
+        # trends disagree, as in detect_trend_mismatch
+        hist_slope = _fast_slope(hist)
+        forecast_slope = _fast_slope(fcst)
+        trend_mismatch = ((hist_slope > 0) & (forecast_slope < 0)) | ((hist_slope < 0) & (forecast_slope > 0))
+        hist_r_squared = np.full(len(hist), np.nan)
+        forecast_r_squared = np.full(len(fcst), np.nan)
+        hist_r_squared[trend_mismatch] = _fast_r_squared(hist[trend_mismatch])
+        forecast_r_squared[trend_mismatch] = _fast_r_squared(fcst[trend_mismatch])
+        trend_confidence = np.where(trend_mismatch,
+                                    np.sqrt(np.minimum(hist_r_squared, forecast_r_squared)), 0.0)
+        
+        # Missing seasonality
+        seasonality_threshold = 1.5
+        hist_seasonal_strength = _seasonal_strength(hist)
+        forecast_seasonal_strength = _seasonal_strength(fcst)
+        missing_seasonality = ((hist_seasonal_strength > seasonality_threshold) &
+                               ~(forecast_seasonal_strength > seasonality_threshold))
+        season_confidence = np.where(missing_seasonality,
+                                     np.minimum(hist_seasonal_strength / seasonality_threshold, 1.0), 0.0)
+        
+        # Volatility mismatch (ddof=1 to match pandas' Series.std)
+        hist_mean = hist.mean(axis=1)
+        forecast_mean_all = fcst.mean(axis=1)
+        hist_cv = np.where(hist_mean != 0, hist.std(axis=1, ddof=1) / hist_mean, 0.0)
+        forecast_cv = np.where(forecast_mean_all != 0, fcst.std(axis=1, ddof=1) / forecast_mean_all, 0.0)
+        volatility_ratio = np.where(hist_cv != 0, forecast_cv / hist_cv, 1.0)
+        volatility_threshold = 0.5
+        too_flat = volatility_ratio < volatility_threshold
+        volatility_confidence = np.where(too_flat,
+                                         (volatility_threshold - volatility_ratio) / volatility_threshold, 0.0)
+        
+        # Magnitude mismatch
+        recent_mean = hist[:, -months:].mean(axis=1)
+        forecast_mean = fcst[:, :months].mean(axis=1)
+        pct_diff = np.where(recent_mean != 0, np.abs(forecast_mean - recent_mean) / recent_mean,
+                            np.where(forecast_mean != 0, np.inf, 0.0))
+        magnitude_threshold = 0.5
+        magnitude_mismatch = pct_diff > magnitude_threshold
+        magnitude_confidence = np.where(magnitude_mismatch,
+                                        np.minimum(pct_diff / magnitude_threshold, 1.0), 0.0)
+        
+        # Overall risk score
+        detected = np.stack([trend_mismatch, missing_seasonality, too_flat, magnitude_mismatch])
+        confidences = np.stack([trend_confidence, season_confidence,
+                                volatility_confidence, magnitude_confidence])
+        detected_issues = detected.sum(axis=0)
+        avg_confidence = np.where(detected_issues > 0,
+                                  np.where(detected, confidences, 0.0).sum(axis=0) / detected_issues, 0.0)
+    
+    return {
+        'trend_mismatch': {
+            'detected': trend_mismatch,
+            'confidence': trend_confidence,
+            'historical_trend': np.where(hist_slope > 0, 'increasing', 'decreasing'),
+            'forecast_trend': np.where(forecast_slope > 0, 'increasing', 'decreasing'),
+            'hist_slope': hist_slope,
+            'forecast_slope': forecast_slope,
+            'hist_r_squared': hist_r_squared,
+            'forecast_r_squared': forecast_r_squared
+        },
+        'missing_seasonality': {
+            'detected': missing_seasonality,
+            'confidence': season_confidence,
+            'hist_seasonal_strength': hist_seasonal_strength,
+            'forecast_seasonal_strength': forecast_seasonal_strength,
+            'threshold': seasonality_threshold
+        },
+        'volatility_mismatch': {
+            'detected': too_flat,
+            'confidence': volatility_confidence,
+            'hist_cv': hist_cv,
+            'forecast_cv': forecast_cv,
+            'volatility_ratio': volatility_ratio,
+            'threshold': volatility_threshold
+        },
+        'magnitude_mismatch': {
+            'detected': magnitude_mismatch,
+            'confidence': magnitude_confidence,
+            'recent_mean': recent_mean,
+            'forecast_mean': forecast_mean,
+            'pct_difference': pct_diff,
+            'threshold': magnitude_threshold
+        },
+        'summary': {
+            'total_issues': detected_issues,
+            'avg_confidence': avg_confidence,
+            'risk_score': detected_issues * avg_confidence
+        }
+    }
+
+
+def get_item_diagnostics(batch_results: Dict, index: int) -> Dict:
+    """
+    Extract the diagnostics of a single item from run_all_diagnostics_batch
+    output, in the same format returned by run_all_diagnostics.
+    """
+    return {
+        name: {key: value[index].item() if isinstance(value, np.ndarray) else value
+               for key, value in result.items()}
+        for name, result in batch_results.items()
     }
+
+
+def run_all_diagnostics_matrix(hist_matrix: np.ndarray, fcst_matrix: np.ndarray, months: int = 6) -> List[Dict]:
+    """
+    Run all diagnostic tests for every row of the NaN-padded matrices built by
+    loader.build_item_matrix, returning one run_all_diagnostics-style dict
+    per row.
+    
+    Rows whose history is a contiguous prefix are batched by history length;
+    any other row is split with a mask and run on its own. Rows with no
+    history or no forecast months cannot be diagnosed and are left as None.
+    """
+    is_hist = ~np.isnan(hist_matrix)
+    n_hist = is_hist.sum(axis=1)
+    is_prefix = is_hist.cumprod(axis=1).sum(axis=1) == n_hist
+    has_both = (n_hist > 0) & (n_hist < hist_matrix.shape[1])
+    
+    results = [None] * len(hist_matrix)
+    for n in np.unique(n_hist[is_prefix & has_both]):
+        rows = np.flatnonzero(is_prefix & (n_hist == n))
+        batch_results = run_all_diagnostics_batch(hist_matrix[rows, :n], fcst_matrix[rows, n:], months)
+        for i, row in enumerate(rows):
+            results[row] = get_item_diagnostics(batch_results, i)
+    
+    for row in np.flatnonzero(~is_prefix & has_both):
+        historical_data = hist_matrix[row][is_hist[row]]
+        forecast_data = fcst_matrix[row][~is_hist[row]]
+        results[row] = run_all_diagnostics(historical_data, forecast_data,
+                                           historical_data[-months:], forecast_data[:months])
     
     return results
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""
+Numba-compiled kernels for the per-item diagnostics and summary statistics.
+
+numba is an optional dependency. When it is not installed NUMBA_AVAILABLE is
+False, the kernels are left as plain Python functions and the diagnostics
+and visualizer modules use their NumPy implementations instead.
+"""
+import math
+import numpy as np
+from typing import Tuple
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit that leaves the function uncompiled."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+# Every fastmath flag except 'nnan'/'ninf': flat series legitimately produce
+# NaN and inf ratios, so the compiler must not assume they cannot occur.
+# error_model='numpy' makes x/0 return inf/nan instead of raising.
+_jit = njit(cache=True, fastmath={'nsz', 'arcp', 'contract', 'afn', 'reassoc'}, error_model='numpy')
+
+
+@_jit
+def _slope_kernel(y: np.ndarray) -> float:
+    """Least-squares slope of y against its index."""
+    n = y.shape[0]
+    x_mean = (n - 1) * 0.5
+    y_mean = y.mean()
+
+    sxx = 0.0
+    sxy = 0.0
+    for i in range(n):
+        dx = i - x_mean
+        sxx += dx * dx
+        sxy += dx * (y[i] - y_mean)
+    return sxy / sxx
+
+
+@_jit
+def _r_squared_kernel(y: np.ndarray) -> float:
+    """R-squared of the least-squares line of y against its index."""
+    n = y.shape[0]
+    x_mean = (n - 1) * 0.5
+    y_mean = y.mean()
+
+    sxx = 0.0
+    sxy = 0.0
+    syy = 0.0
+    for i in range(n):
+        dx = i - x_mean
+        dy = y[i] - y_mean
+        sxx += dx * dx
+        sxy += dx * dy
+        syy += dy * dy
+
+    denom = sxx * syy
+    r_squared = sxy * sxy / denom if denom > 0 else 0.0
+    return min(r_squared, 1.0)
+
+
+@_jit
+def _vol_kernel(y: np.ndarray) -> float:
+    """Coefficient of variation (sample std, ddof=1) or 0 for zero-mean data."""
+    n = y.shape[0]
+    mean = y.mean()
+    if mean == 0:
+        return 0.0
+
+    ss = 0.0
+    for i in range(n):
+        d = y[i] - mean
+        ss += d * d
+    return math.sqrt(ss / (n - 1)) / mean
+
+
+@_jit
+def _mag_kernel(recent_actuals: np.ndarray, early_forecast: np.ndarray) -> Tuple[float, float, float]:
+    """Means of both windows and their relative difference."""
+    recent_mean = recent_actuals.mean()
+    forecast_mean = early_forecast.mean()
+
+    if recent_mean != 0:
+        pct_diff = abs(forecast_mean - recent_mean) / recent_mean
+    else:
+        pct_diff = np.inf if forecast_mean != 0 else 0.0
+    return recent_mean, forecast_mean, pct_diff
+
+
+@_jit
+def _dft_bin_kernel(x: np.ndarray, k: int) -> float:
+    """Magnitude of DFT bin k computed with the Goertzel recurrence."""
+    n = x.shape[0]
+    coeff = 2.0 * math.cos(2.0 * math.pi * k / n)
+    s_prev = 0.0
+    s_prev2 = 0.0
+    for i in range(n):
+        s = x[i] + coeff * s_prev - s_prev2
+        s_prev2 = s_prev
+        s_prev = s
+    power = s_prev * s_prev + s_prev2 * s_prev2 - coeff * s_prev * s_prev2
+    return math.sqrt(max(power, 0.0))
+
+
+@_jit
+def _seasonal_strength_kernel(x: np.ndarray) -> float:
+    """
+    Magnitude of the 12-month bin relative to the mean magnitude of all
+    non-DC bins, matching the FFT-based definition in diagnostics.
+
+    Every bin is evaluated with its own Goertzel pass, which is O(n²). That
+    is cheaper than an FFT call for the ~50-month series here, but longer
+    series should use the FFT version (see diagnostics._SEASONAL_KERNEL_MAX_POINTS).
+    """
+    n = x.shape[0]
+    seasonal_freq_index = n // 12 if n >= 12 else 1
+
+    # A constant series has no seasonal content; its non-DC bins would only
+    # hold rounding noise (0/0 in the FFT version)
+    flat = True
+    for i in range(1, n):
+        if x[i] != x[0]:
+            flat = False
+            break
+    if flat:
+        return 0.0
+
+    # Removing the mean leaves the non-DC bins unchanged and keeps the
+    # recurrence well conditioned for series with a large level
+    centered = x - x.mean()
+
+    # Bins above n/2 mirror the lower half of a real signal's spectrum
+    total = 0.0
+    for k in range(1, n // 2 + 1):
+        magnitude = _dft_bin_kernel(centered, k)
+        total += magnitude if 2 * k == n else 2.0 * magnitude
+
+    return _dft_bin_kernel(centered, seasonal_freq_index) / (total / (n - 1))
+
+
+@_jit
+def _series_stats_kernel(y: np.ndarray) -> Tuple[float, float, float, float, float, float]:
+    """
+    Mean, sample std (ddof=1), CV, min, max and least-squares slope against
+    the index, accumulated in a single pass (Welford for the variance).
+    """
+    n = y.shape[0]
+    x_mean = (n - 1) * 0.5
+
+    mean = 0.0
+    m2 = 0.0
+    sxy = 0.0
+    y_min = y[0]
+    y_max = y[0]
+    for i in range(n):
+        v = y[i]
+        delta = v - mean
+        mean += delta / (i + 1)
+        m2 += delta * (v - mean)
+        # sum((x - x_mean) * y) equals sum((x - x_mean) * (y - y_mean))
+        sxy += (i - x_mean) * v
+        if v < y_min:
+            y_min = v
+        if v > y_max:
+            y_max = v
+
+    std = math.sqrt(m2 / (n - 1))
+    cv = std / mean if mean != 0 else 0.0
+    # sum((x - x_mean)**2) for x = 0..n-1
+    slope = sxy / (n * (n * n - 1) / 12.0)
+    return mean, std, cv, y_min, y_max, slope
+
+
+def _warmup() -> None:
+    """Compile (or load from cache) every kernel for float64 input."""
+    dummy = np.linspace(1.0, 2.0, 54)
+    _slope_kernel(dummy)
+    _r_squared_kernel(dummy)
+    _vol_kernel(dummy)
+    _mag_kernel(dummy[-6:], dummy[:6])
+    _seasonal_strength_kernel(dummy)
+    _series_stats_kernel(dummy)
+
+
+if NUMBA_AVAILABLE:
+    _warmup()
@@ -2,6 +2,7 @@
 LLM-based explanation generator for forecast issues.
 """
 from typing import Dict, List
+import numpy as np
 import pandas as pd
 
 
@@ -12,8 +13,8 @@ def prepare_analysis_summary(item_id: str, diagnostics: Dict,
     """
     summary_parts = [
         f"Analysis for item {item_id}:",
-        f"Historical data: {len(historical_data)} months, mean={historical_data.mean():.2f}, std={historical_data.std():.2f}",
-        f"Forecast data: {len(forecast_data)} months, mean={forecast_data.mean():.2f}, std={forecast_data.std():.2f}",
+        f"Historical data: {len(historical_data)} months, mean={np.mean(historical_data):.2f}, std={np.std(historical_data, ddof=1):.2f}",
+        f"Forecast data: {len(forecast_data)} months, mean={np.mean(forecast_data):.2f}, std={np.std(forecast_data, ddof=1):.2f}",
         ""
     ]
     
@@ -73,54 +74,107 @@ def generate_explanation(analysis_summary: str, use_mock: bool = True) -> str:
         pass
 
 
+# Bit flags describing which issues were detected, see get_issue_flags
+TREND_FLAG = 0b1000
+SEASONALITY_FLAG = 0b0100
+VOLATILITY_FLAG = 0b0010
+MAGNITUDE_FLAG = 0b0001
+
+_TREND_AND_SEASONALITY_EXPLANATION = (
+    "The forecast appears problematic due to multiple issues. "
+    "First, the forecasting model seems to have missed the underlying trend direction "
+    "seen in the historical data. Additionally, there are clear seasonal patterns "
+    "in the past that are not reflected in the forecast, making it appear unnaturally flat. "
+    "This suggests the model may need recalibration or a different forecasting approach "
+    "that better captures both trend and seasonal components.")
+
+_TREND_AND_VOLATILITY_EXPLANATION = (
+    "The forecast shows concerning issues with both trend direction and volatility. "
+    "The model appears to have reversed the historical trend, which could indicate "
+    "overfitting to recent noise or a structural break in the data that wasn't properly "
+    "accounted for. The forecast is also unusually smooth compared to historical variation, "
+    "suggesting the model may be overly conservative in its predictions.")
+
+_TREND_EXPLANATION = (
+    "There's a significant trend mismatch between historical data and the forecast. "
+    "The forecasting model seems to predict the opposite direction from what the "
+    "historical trend suggests, which could indicate model miscalibration or "
+    "the presence of a structural break in the time series that requires attention.")
+
+_SEASONALITY_EXPLANATION = (
+    "The forecast appears to miss important seasonal patterns present in the historical data. "
+    "This could mean the forecasting model doesn't adequately capture seasonal cycles, "
+    "which are crucial for accurate demand planning. The model may benefit from "
+    "seasonal decomposition or using algorithms better suited for seasonal time series.")
+
+_VOLATILITY_EXPLANATION = (
+    "The forecast appears unusually flat compared to the natural variation seen in "
+    "historical data. This over-smoothing could lead to understocking during high-demand "
+    "periods and overstocking during low-demand periods. The model may need adjustment "
+    "to better reflect realistic demand uncertainty.")
+
+_MAGNITUDE_EXPLANATION = (
+    "There's a significant gap between recent actual demand levels and the early forecast "
+    "predictions. This could indicate the model isn't properly accounting for recent trends "
+    "or level shifts in demand. The forecast may need recalibration using more recent data "
+    "or a different baseline approach.")
+
+_NO_ISSUES_EXPLANATION = (
+    "The forecast appears well-aligned with historical patterns. No significant issues "
+    "were detected in terms of trend direction, seasonality, volatility, or magnitude. "
+    "The forecasting model seems to be performing appropriately for this item.")
+
+
+def _select_mock_explanation(flags: int) -> str:
+    """Pick the explanation for a flag combination, most important issue first."""
+    if flags & TREND_FLAG:
+        if flags & SEASONALITY_FLAG:
+            return _TREND_AND_SEASONALITY_EXPLANATION
+        elif flags & VOLATILITY_FLAG:
+            return _TREND_AND_VOLATILITY_EXPLANATION
+        else:
+            return _TREND_EXPLANATION
+    elif flags & SEASONALITY_FLAG:
+        return _SEASONALITY_EXPLANATION
+    elif flags & VOLATILITY_FLAG:
+        return _VOLATILITY_EXPLANATION
+    elif flags & MAGNITUDE_FLAG:
+        return _MAGNITUDE_EXPLANATION
+    else:
+        return _NO_ISSUES_EXPLANATION
+
+
+# Explanation for every one of the 16 flag combinations, indexed by flags
+_MOCK_EXPLANATIONS = tuple(_select_mock_explanation(flags) for flags in range(16))
+
+
+def get_issue_flags(diagnostics: Dict) -> int:
+    """
+    Pack the detected issues into a 4-bit integer:
+    trend << 3 | seasonality << 2 | volatility << 1 | magnitude.
+    """
+    return (bool(diagnostics['trend_mismatch']['detected']) << 3
+            | bool(diagnostics['missing_seasonality']['detected']) << 2
+            | bool(diagnostics['volatility_mismatch']['detected']) << 1
+            | bool(diagnostics['magnitude_mismatch']['detected']))
+
+
+def generate_mock_explanation_flags(flags: int) -> str:
+    """
+    Generate a mock explanation from the issue flags of get_issue_flags.
+    """
+    return _MOCK_EXPLANATIONS[flags]
+
+
 def generate_mock_explanation(analysis_summary: str) -> str:
     """
     Generate a mock explanation based on detected issues.
     """
-    if "TREND MISMATCH" in analysis_summary:
-        if "MISSING SEASONALITY" in analysis_summary:
-            return ("The forecast appears problematic due to multiple issues. "
-                   "First, the forecasting model seems to have missed the underlying trend direction "
-                   "seen in the historical data. Additionally, there are clear seasonal patterns "
-                   "in the past that are not reflected in the forecast, making it appear unnaturally flat. "
-                   "This suggests the model may need recalibration or a different forecasting approach "
-                   "that better captures both trend and seasonal components.")
-        
-        elif "VOLATILITY MISMATCH" in analysis_summary:
-            return ("The forecast shows concerning issues with both trend direction and volatility. "
-                   "The model appears to have reversed the historical trend, which could indicate "
-                   "overfitting to recent noise or a structural break in the data that wasn't properly "
-                   "accounted for. The forecast is also unusually smooth compared to historical variation, "
-                   "suggesting the model may be overly conservative in its predictions.")
-        
-        else:
-            return ("There's a significant trend mismatch between historical data and the forecast. "
-                   "The forecasting model seems to predict the opposite direction from what the "
-                   "historical trend suggests, which could indicate model miscalibration or "
-                   "the presence of a structural break in the time series that requires attention.")
-    
-    elif "MISSING SEASONALITY" in analysis_summary:
-        return ("The forecast appears to miss important seasonal patterns present in the historical data. "
-               "This could mean the forecasting model doesn't adequately capture seasonal cycles, "
-               "which are crucial for accurate demand planning. The model may benefit from "
-               "seasonal decomposition or using algorithms better suited for seasonal time series.")
-    
-    elif "VOLATILITY MISMATCH" in analysis_summary:
-        return ("The forecast appears unusually flat compared to the natural variation seen in "
-               "historical data. This over-smoothing could lead to understocking during high-demand "
-               "periods and overstocking during low-demand periods. The model may need adjustment "
-               "to better reflect realistic demand uncertainty.")
-    
-    elif "MAGNITUDE MISMATCH" in analysis_summary:
-        return ("There's a significant gap between recent actual demand levels and the early forecast "
-               "predictions. This could indicate the model isn't properly accounting for recent trends "
-               "or level shifts in demand. The forecast may need recalibration using more recent data "
-               "or a different baseline approach.")
-    
-    else:
-        return ("The forecast appears well-aligned with historical patterns. No significant issues "
-               "were detected in terms of trend direction, seasonality, volatility, or magnitude. "
-               "The forecasting model seems to be performing appropriately for this item.")
+    flags = ((TREND_FLAG if "TREND MISMATCH" in analysis_summary else 0)
+             | (SEASONALITY_FLAG if "MISSING SEASONALITY" in analysis_summary else 0)
+             | (VOLATILITY_FLAG if "VOLATILITY MISMATCH" in analysis_summary else 0)
+             | (MAGNITUDE_FLAG if "MAGNITUDE MISMATCH" in analysis_summary else 0))
+    return generate_mock_explanation_flags(flags)
 
 
 def format_explanation_report(item_id: str, diagnostics: Dict, explanation: str) -> Dict:
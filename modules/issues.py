@@ -0,0 +1,9 @@
+"""
+Issue types reported by the forecast diagnostics.
+
+Kept free of heavy imports so modules that only need the issue keys (the
+visualizer and reporter) do not load scipy or numba through diagnostics.
+"""
+
+# Diagnostic tests in the order they are run and reported
+ISSUE_KEYS = ('trend_mismatch', 'missing_seasonality', 'volatility_mismatch', 'magnitude_mismatch')
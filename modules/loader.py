@@ -1,17 +1,80 @@
 """
 Data loader module for forecast monitoring agent.
 """
+import importlib.util
+import os
 import pandas as pd
-from typing import Dict, Tuple, List
+from typing import Dict, Tuple, List, Optional, Sequence
 import numpy as np
 
+# Columns used by the monitor; quantities fit comfortably in float32
+DATA_COLUMNS = ('item_loc_id', 'FORECAST_MONTH', 'clean_qty', 'best_model_forecast')
+DATA_DTYPES = {'clean_qty': 'float32', 'best_model_forecast': 'float32'}
 
-def load_data(file_path: str) -> pd.DataFrame:
-    """Load the forecast data from CSV."""
-    return pd.read_csv(file_path)
+# The pyarrow CSV parser is multi-threaded and several times faster than the C one
+CSV_ENGINE = 'pyarrow' if importlib.util.find_spec('pyarrow') is not None else 'c'
 
 
-def get_item_data(df: pd.DataFrame, item_loc_id: str) -> Tuple[pd.Series, pd.Series]:
+def load_data(file_path: str, usecols: Optional[Sequence[str]] = DATA_COLUMNS,
+              dtype: Optional[Dict[str, str]] = DATA_DTYPES) -> pd.DataFrame:
+    """
+    Load the forecast data from Parquet or CSV.
+    
+    By default only the columns the monitor uses are read, with quantities as
+    float32. Pass usecols=None / dtype=None to load everything as-is.
+    
+    A CSV file is converted to a Parquet sidecar next to it on first load
+    (when a Parquet engine is installed); later loads read the sidecar for
+    as long as it is newer than the CSV. The sidecar keeps the CSV's own
+    precision and dtype is applied after reading, so the result does not
+    depend on whether the sidecar exists.
+    """
+    columns = list(usecols) if usecols is not None else None
+    if file_path.endswith('.parquet'):
+        return _encode_item_ids(_read_parquet(file_path, columns, dtype))
+    
+    sidecar_path = os.path.splitext(file_path)[0] + '.parquet'
+    if (columns is not None and os.path.exists(sidecar_path)
+            and os.path.getmtime(sidecar_path) >= os.path.getmtime(file_path)):
+        try:
+            return _encode_item_ids(_read_parquet(sidecar_path, columns, dtype))
+        except (ImportError, OSError, ValueError):
+            pass  # No engine, unreadable file or missing columns: rebuild from the CSV
+    
+    df = _encode_item_ids(pd.read_csv(file_path, usecols=columns, engine=CSV_ENGINE))
+    try:
+        df.to_parquet(sidecar_path, index=False)
+    except (ImportError, OSError):
+        pass  # No Parquet engine or read-only directory: keep using the CSV
+    return _apply_dtypes(df, dtype)
+
+
+def _encode_item_ids(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Store item_loc_id as a categorical whose categories are the ids in order
+    of first appearance, so the unique ids are known without rehashing and
+    comparisons/groupbys run on integer codes.
+    """
+    if 'item_loc_id' in df.columns and not isinstance(df['item_loc_id'].dtype, pd.CategoricalDtype):
+        item_ids = df['item_loc_id']
+        df['item_loc_id'] = pd.Categorical(item_ids, categories=item_ids.dropna().unique())
+    return df
+
+
+def _read_parquet(file_path: str, columns: Optional[List[str]],
+                  dtype: Optional[Dict[str, str]]) -> pd.DataFrame:
+    """Read a Parquet file and apply the requested dtypes."""
+    return _apply_dtypes(pd.read_parquet(file_path, columns=columns), dtype)
+
+
+def _apply_dtypes(df: pd.DataFrame, dtype: Optional[Dict[str, str]]) -> pd.DataFrame:
+    """Cast the columns named in dtype that are present in the frame."""
+    if dtype:
+        df = df.astype({col: col_dtype for col, col_dtype in dtype.items() if col in df.columns})
+    return df
+
+
+def get_item_data(df: pd.DataFrame, item_loc_id: str) -> Tuple[np.ndarray, np.ndarray]:
     """
     Extract historical and forecast data for a specific item.
     
@@ -24,27 +87,80 @@ def get_item_data(df: pd.DataFrame, item_loc_id: str) -> Tuple[pd.Series, pd.Ser
     if len(item_df) != 54:  # Should be 54 months total
         raise ValueError(f"Expected 54 months of data for {item_loc_id}, got {len(item_df)}")
     
-    # Historical data: where clean_qty is not null
-    historical_mask = pd.notna(item_df['clean_qty'])
-    historical_data = item_df[historical_mask]['clean_qty'].reset_index(drop=True)
+    return _split_history(item_df['clean_qty'].to_numpy(), item_df['best_model_forecast'].to_numpy())
+
+
+def _split_history(qty: np.ndarray, forecast: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Split one item's months into historical data (clean_qty where not null)
+    and forecast data (best_model_forecast where clean_qty is null).
+    """
+    is_forecast = np.isnan(qty)
+    
+    # History is normally a leading block followed by the forecast months,
+    # so one split index gives both parts as slices
+    split = int(is_forecast.argmax()) if is_forecast.any() else len(qty)
+    if is_forecast[split:].all():
+        return qty[:split], forecast[split:]
+    
+    # Gaps in the history: fall back to masking
+    return qty[~is_forecast], forecast[is_forecast]
+
+
+def build_item_matrix(df: pd.DataFrame) -> Tuple[Dict[str, int], np.ndarray, np.ndarray]:
+    """
+    Pack every item into row-per-item float32 matrices of shape (n_items, 54).
+    
+    Returns:
+        item_index: item_loc_id -> row number (items without exactly 54 months are left out)
+        hist_matrix: clean_qty per month, NaN in forecast months
+        fcst_matrix: best_model_forecast in months where clean_qty is null, NaN elsewhere
+    """
+    counts = df['item_loc_id'].value_counts()
+    complete = df[df['item_loc_id'].isin(counts.index[counts == 54])]
+    complete = complete.sort_values(['item_loc_id', 'FORECAST_MONTH'])
+    
+    hist_matrix = complete['clean_qty'].to_numpy(dtype=np.float32).reshape(-1, 54)
+    fcst_matrix = complete['best_model_forecast'].to_numpy(dtype=np.float32).reshape(-1, 54)
+    # to_numpy may hand back a read-only view, so build a new array
+    fcst_matrix = np.where(np.isnan(hist_matrix), fcst_matrix, np.float32(np.nan))
     
-    # Forecast data: where clean_qty is null, use best_model_forecast
-    forecast_mask = pd.isna(item_df['clean_qty'])
-    forecast_data = item_df[forecast_mask]['best_model_forecast'].reset_index(drop=True)
+    item_ids = complete['item_loc_id'].to_numpy()[::54]
+    item_index = {item_loc_id: row for row, item_loc_id in enumerate(item_ids)}
+    return item_index, hist_matrix, fcst_matrix
+
+
+def get_item_data_from_matrix(item_index: Dict[str, int], hist_matrix: np.ndarray, fcst_matrix: np.ndarray,
+                              item_loc_id: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Extract historical and forecast data for a specific item from the
+    matrices built by build_item_matrix. Same output as get_item_data.
+    """
+    row = item_index.get(item_loc_id)
+    if row is None:
+        raise ValueError(f"Expected 54 months of data for {item_loc_id}")
     
-    return historical_data, forecast_data
+    return _split_history(hist_matrix[row], fcst_matrix[row])
 
 
 def get_all_item_ids(df: pd.DataFrame) -> List[str]:
-    """Get list of all unique item_loc_ids."""
+    """
+    Get list of all unique item_loc_ids.
+    
+    For frames from load_data this is the categorical's categories (the ids
+    in the loaded file), without a pass over the rows.
+    """
+    if isinstance(df['item_loc_id'].dtype, pd.CategoricalDtype):
+        return df['item_loc_id'].cat.categories.tolist()
     return df['item_loc_id'].unique().tolist()
 
 
-def get_recent_actuals(historical_data: pd.Series, months: int = 6) -> pd.Series:
-    """Get the last N months of historical data."""
-    return historical_data.tail(months)
+def get_recent_actuals(historical_data: pd.Series, months: int = 6) -> np.ndarray:
+    """Get the last N months of historical data (a view, no copy)."""
+    values = np.asarray(historical_data)
+    return values[max(len(values) - months, 0):]
 
 
-def get_early_forecast(forecast_data: pd.Series, months: int = 6) -> pd.Series:
-    """Get the first N months of forecast data."""
-    return forecast_data.head(months)
\ No newline at end of file
+def get_early_forecast(forecast_data: pd.Series, months: int = 6) -> np.ndarray:
+    """Get the first N months of forecast data (a view, no copy)."""
+    return np.asarray(forecast_data)[:months]
\ No newline at end of file
@@ -3,27 +3,30 @@ Report formatting functions for forecast monitoring results.
 """
 import pandas as pd
 from typing import Dict, List
+import heapq
 import json
+from operator import itemgetter
+from modules.issues import ISSUE_KEYS
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 
 def create_summary_report(all_results: List[Dict]) -> pd.DataFrame:
     """
     Create a summary report across all analyzed items.
     """
-    report_data = []
-    
-    for result in all_results:
-        item_data = {
-            'item_id': result['item_id'],
-            'risk_score': result['risk_score'],
-            'total_issues': result['total_issues'],
-            'avg_confidence': result['avg_confidence'],
-            'trend_mismatch': result['detailed_diagnostics']['trend_mismatch']['detected'],
-            'missing_seasonality': result['detailed_diagnostics']['missing_seasonality']['detected'],
-            'volatility_mismatch': result['detailed_diagnostics']['volatility_mismatch']['detected'],
-            'magnitude_mismatch': result['detailed_diagnostics']['magnitude_mismatch']['detected']
-        }
-        report_data.append(item_data)
+    # Build each column in one pass instead of one dict per row
+    report_data = {
+        column: [result[column] for result in all_results]
+        for column in ('item_id', 'risk_score', 'total_issues', 'avg_confidence')
+    }
+    diagnostics = [result['detailed_diagnostics'] for result in all_results]
+    for key in ISSUE_KEYS:
+        report_data[key] = [diag[key]['detected'] for diag in diagnostics]
     
     return pd.DataFrame(report_data).sort_values('risk_score', ascending=False)
 
@@ -32,69 +35,58 @@ def create_detailed_report(result: Dict) -> str:
     """
     Create a detailed text report for a single item.
     """
-    lines = [
-        f"=== FORECAST ANALYSIS REPORT ===",
-        f"Item ID: {result['item_id']}",
-        f"Risk Score: {result['risk_score']:.3f}",
-        f"Issues Detected: {result['total_issues']}",
-        f"Average Confidence: {result['avg_confidence']:.3f}",
-        "",
-        "=== EXPLANATION ===",
-        result['explanation'],
-        "",
-        "=== DETAILED DIAGNOSTICS ==="
-    ]
-    
     diagnostics = result['detailed_diagnostics']
-    
-    # Trend Mismatch
     trend = diagnostics['trend_mismatch']
-    lines.extend([
-        f"Trend Mismatch: {'DETECTED' if trend['detected'] else 'Not detected'}",
-        f"  Confidence: {trend['confidence']:.3f}",
-        f"  Historical Trend: {trend['historical_trend']}",
-        f"  Forecast Trend: {trend['forecast_trend']}",
-        ""
-    ])
-    
-    # Missing Seasonality
     season = diagnostics['missing_seasonality']
-    lines.extend([
-        f"Missing Seasonality: {'DETECTED' if season['detected'] else 'Not detected'}",
-        f"  Confidence: {season['confidence']:.3f}",
-        f"  Historical Seasonal Strength: {season['hist_seasonal_strength']:.3f}",
-        f"  Forecast Seasonal Strength: {season['forecast_seasonal_strength']:.3f}",
-        ""
-    ])
-    
-    # Volatility Mismatch
     vol = diagnostics['volatility_mismatch']
-    lines.extend([
-        f"Volatility Mismatch: {'DETECTED' if vol['detected'] else 'Not detected'}",
-        f"  Confidence: {vol['confidence']:.3f}",
-        f"  Historical CV: {vol['hist_cv']:.3f}",
-        f"  Forecast CV: {vol['forecast_cv']:.3f}",
-        f"  Volatility Ratio: {vol['volatility_ratio']:.3f}",
-        ""
-    ])
-    
-    # Magnitude Mismatch
     mag = diagnostics['magnitude_mismatch']
-    lines.extend([
-        f"Magnitude Mismatch: {'DETECTED' if mag['detected'] else 'Not detected'}",
-        f"  Confidence: {mag['confidence']:.3f}",
-        f"  Recent Actuals Mean: {mag['recent_mean']:.2f}",
-        f"  Early Forecast Mean: {mag['forecast_mean']:.2f}",
-        f"  Percentage Difference: {mag['pct_difference']*100:.1f}%",
-    ])
     
-    return "\n".join(lines)
+    return (
+        f"=== FORECAST ANALYSIS REPORT ===\n"
+        f"Item ID: {result['item_id']}\n"
+        f"Risk Score: {result['risk_score']:.3f}\n"
+        f"Issues Detected: {result['total_issues']}\n"
+        f"Average Confidence: {result['avg_confidence']:.3f}\n"
+        f"\n"
+        f"=== EXPLANATION ===\n"
+        f"{result['explanation']}\n"
+        f"\n"
+        f"=== DETAILED DIAGNOSTICS ===\n"
+        f"Trend Mismatch: {'DETECTED' if trend['detected'] else 'Not detected'}\n"
+        f"  Confidence: {trend['confidence']:.3f}\n"
+        f"  Historical Trend: {trend['historical_trend']}\n"
+        f"  Forecast Trend: {trend['forecast_trend']}\n"
+        f"\n"
+        f"Missing Seasonality: {'DETECTED' if season['detected'] else 'Not detected'}\n"
+        f"  Confidence: {season['confidence']:.3f}\n"
+        f"  Historical Seasonal Strength: {season['hist_seasonal_strength']:.3f}\n"
+        f"  Forecast Seasonal Strength: {season['forecast_seasonal_strength']:.3f}\n"
+        f"\n"
+        f"Volatility Mismatch: {'DETECTED' if vol['detected'] else 'Not detected'}\n"
+        f"  Confidence: {vol['confidence']:.3f}\n"
+        f"  Historical CV: {vol['hist_cv']:.3f}\n"
+        f"  Forecast CV: {vol['forecast_cv']:.3f}\n"
+        f"  Volatility Ratio: {vol['volatility_ratio']:.3f}\n"
+        f"\n"
+        f"Magnitude Mismatch: {'DETECTED' if mag['detected'] else 'Not detected'}\n"
+        f"  Confidence: {mag['confidence']:.3f}\n"
+        f"  Recent Actuals Mean: {mag['recent_mean']:.2f}\n"
+        f"  Early Forecast Mean: {mag['forecast_mean']:.2f}\n"
+        f"  Percentage Difference: {mag['pct_difference']*100:.1f}%"
+    )
 
 
 def export_results_to_json(all_results: List[Dict], file_path: str) -> None:
     """
     Export all results to a JSON file for further analysis.
     """
+    if ORJSON_AVAILABLE:
+        # orjson writes NumPy scalars natively; NaN/inf become null
+        with open(file_path, 'wb') as f:
+            f.write(orjson.dumps(all_results, default=str,
+                                 option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2))
+        return
+    
     with open(file_path, 'w') as f:
         json.dump(all_results, f, indent=2, default=str)
 
@@ -103,30 +95,16 @@ def get_top_risk_items(all_results: List[Dict], top_n: int = 10) -> List[Dict]:
     """
     Get the top N highest risk items.
     """
-    sorted_results = sorted(all_results, key=lambda x: x['risk_score'], reverse=True)
-    return sorted_results[:top_n]
+    return heapq.nlargest(top_n, all_results, key=itemgetter('risk_score'))
 
 
 def create_issue_breakdown(all_results: List[Dict]) -> Dict[str, int]:
     """
     Create a breakdown of issue types across all items.
     """
-    breakdown = {
-        'trend_mismatch': 0,
-        'missing_seasonality': 0,
-        'volatility_mismatch': 0,
-        'magnitude_mismatch': 0
-    }
-    
-    for result in all_results:
-        diagnostics = result['detailed_diagnostics']
-        if diagnostics['trend_mismatch']['detected']:
-            breakdown['trend_mismatch'] += 1
-        if diagnostics['missing_seasonality']['detected']:
-            breakdown['missing_seasonality'] += 1
-        if diagnostics['volatility_mismatch']['detected']:
-            breakdown['volatility_mismatch'] += 1
-        if diagnostics['magnitude_mismatch']['detected']:
-            breakdown['magnitude_mismatch'] += 1
+    diagnostics = [result['detailed_diagnostics'] for result in all_results]
     
-    return breakdown
\ No newline at end of file
+    return {
+        key: sum(1 for diag in diagnostics if diag[key]['detected'])
+        for key in ISSUE_KEYS
+    }
\ No newline at end of file
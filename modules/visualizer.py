@@ -1,103 +1,199 @@
 """
 Visualization functions for forecast monitoring.
 """
-import matplotlib.pyplot as plt
+import io
+import os
+import sys
+from functools import lru_cache
 import pandas as pd
 import numpy as np
-from typing import Dict, Optional, Tuple
-import seaborn as sns
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+from modules.issues import ISSUE_KEYS
 
-plt.style.use('default')
-sns.set_palette("husl")
+if TYPE_CHECKING:
+    from matplotlib.axes import Axes
+    from matplotlib.figure import Figure
+
+# seaborn's default 6-color "husl" palette
+_HUSL_PALETTE = ['#f77189', '#bb9832', '#50b131', '#36ada4', '#3ba3ec', '#e866f4']
+
+# matplotlib.pyplot, imported on first use so that callers which only need
+# the statistics table do not pay for loading matplotlib
+_plt = None
+
+# (figsize, figure) redrawn by render_forecast_png(reuse_figure=True)
+_reusable_fig = None
+
+# (diagnostics key, bar label, color) for each issue type, in ISSUE_KEYS order
+_ISSUE_SPECS = (
+    ('trend_mismatch', 'Trend\nMismatch', 'red'),
+    ('missing_seasonality', 'Missing\nSeasonality', 'orange'),
+    ('volatility_mismatch', 'Too Flat', 'purple'),
+    ('magnitude_mismatch', 'Magnitude\nMismatch', 'brown')
+)
+
+# Fixed layout of the series panel over the issue panel; cheaper than
+# running tight_layout on every figure
+_GRIDSPEC_KW = {
+    'height_ratios': [3, 1],
+    'hspace': 0.35,
+    'left': 0.08,
+    'right': 0.97,
+    'top': 0.93,
+    'bottom': 0.09
+}
+
+# Longer series are decimated before drawing; the axes are only ~1000 px wide
+_MAX_PLOT_POINTS = 2000
+
+# (diagnostics key, annotation text, color) for the issues marked on the
+# series panel, in ISSUE_KEYS order; rows match the anchor rows built in
+# plot_forecast_analysis
+_ANNOTATION_SPECS = (
+    ('trend_mismatch', 'Trend Mismatch', 'red'),
+    ('missing_seasonality', 'Missing Seasonality', 'orange'),
+    ('volatility_mismatch', 'Too Flat', 'purple')
+)
+
+
+def _get_plt():
+    """Import and configure matplotlib.pyplot on first call."""
+    global _plt
+    if _plt is None:
+        import matplotlib
+        from cycler import cycler
+        # Figures are only ever rendered to images, so skip loading a GUI
+        # backend. Leave the choice alone if pyplot is already in use (switching
+        # would close the caller's figures) or MPLBACKEND names a backend
+        if 'matplotlib.pyplot' not in sys.modules and 'MPLBACKEND' not in os.environ:
+            matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        
+        plt.style.use('default')
+        plt.rcParams.update({
+            'axes.prop_cycle': cycler(color=_HUSL_PALETTE),
+            'path.simplify': True,
+            'agg.path.chunksize': 10000
+        })
+        _plt = plt
+    return _plt
+
+
+def _get_reusable_fig(figsize: Tuple[int, int]) -> 'Figure':
+    """
+    Figure shared by successive plots that are rendered and then discarded.
+    Asking for a different figsize closes the current figure and replaces it.
+    """
+    global _reusable_fig
+    figsize = tuple(figsize)
+    if _reusable_fig is None or _reusable_fig[0] != figsize:
+        plt = _get_plt()
+        if _reusable_fig is not None:
+            plt.close(_reusable_fig[1])
+        fig, _ = plt.subplots(2, 1, figsize=figsize, gridspec_kw=_GRIDSPEC_KW, dpi=100)
+        _reusable_fig = (figsize, fig)
+    return _reusable_fig[1]
 
 
 def plot_forecast_analysis(historical_data: pd.Series, forecast_data: pd.Series, 
                           diagnostics: Dict, item_id: str, 
-                          figsize: Tuple[int, int] = (12, 8)) -> plt.Figure:
+                          figsize: Tuple[int, int] = (12, 8),
+                          fig: Optional['Figure'] = None,
+                          axes: Optional[Tuple['Axes', 'Axes']] = None) -> 'Figure':
     """
     Create a comprehensive plot showing historical vs forecast with issue annotations.
+    
+    Pass a figure from an earlier call as fig (and optionally its two axes)
+    to clear and redraw it instead of creating a new one.
     """
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=figsize, height_ratios=[3, 1])
+    plt = _get_plt()
+    from matplotlib.collections import LineCollection
+    from matplotlib.lines import Line2D
     
-    # Main time series plot
-    hist_months = range(1, len(historical_data) + 1)
-    forecast_months = range(len(historical_data) + 1, len(historical_data) + len(forecast_data) + 1)
+    hist_vals = _to_numpy(historical_data)
+    fcst_vals = _to_numpy(forecast_data)
+    n_h = hist_vals.size
+    n_f = fcst_vals.size
+    hist_max = hist_vals.max()
+    fcst_min = fcst_vals.min()
+    fcst_mean = fcst_vals.mean()
     
-    # Plot historical data
-    ax1.plot(hist_months, historical_data.values, 'b-', linewidth=2, label='Historical', alpha=0.8)
+    if fig is None:
+        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=figsize, gridspec_kw=_GRIDSPEC_KW, dpi=100)
+    else:
+        ax1, ax2 = axes if axes is not None else fig.axes
+        ax1.cla()
+        ax2.cla()
     
-    # Plot forecast data
-    ax1.plot(forecast_months, forecast_data.values, 'r--', linewidth=2, label='Forecast', alpha=0.8)
+    # Main time series plot
+    hist_months = np.arange(1, n_h + 1)
+    forecast_months = np.arange(n_h + 1, n_h + n_f + 1)
+    
+    # Historical and forecast series share one collection artist. Series and
+    # bars are rasterized so vector output (PDF/SVG) stays small for long
+    # series; PNG output is unaffected
+    hist_xy = _downsample(hist_months, hist_vals)
+    fcst_xy = _downsample(forecast_months, fcst_vals)
+    series = LineCollection([np.column_stack(hist_xy), np.column_stack(fcst_xy)],
+                            colors=['b', 'r'], linestyles=['-', '--'], linewidths=2,
+                            alpha=0.8, rasterized=True)
+    ax1.add_collection(series)
+    # The legend's loc='best' ignores the paths of a LineCollection but does
+    # check every Line2D, visible or not, so add invisible copies of both
+    # series for it to avoid
+    for x, y in (hist_xy, fcst_xy):
+        ax1.add_line(Line2D(x, y, visible=False))
+    ax1.autoscale_view()
     
     # Add vertical line separating historical and forecast
-    ax1.axvline(x=len(historical_data), color='gray', linestyle=':', alpha=0.7, label='Forecast Start')
+    forecast_start = ax1.axvline(x=n_h, color='gray', linestyle=':', alpha=0.7, label='Forecast Start')
+    
+    # Look up each issue's flag once; both panels branch on this mask
+    detected_mask = np.array([diagnostics[key]['detected'] for key in ISSUE_KEYS], dtype=bool)
     
     # Highlight issues with annotations
-    y_range = ax1.get_ylim()[1] - ax1.get_ylim()[0]
-    
-    if diagnostics['trend_mismatch']['detected']:
-        ax1.annotate('Trend Mismatch', 
-                    xy=(len(historical_data)/2, max(historical_data.values)), 
-                    xytext=(len(historical_data)/2, max(historical_data.values) + y_range*0.1),
-                    arrowprops=dict(arrowstyle='->', color='red', alpha=0.7),
-                    fontsize=10, color='red', weight='bold')
-    
-    if diagnostics['missing_seasonality']['detected']:
-        ax1.annotate('Missing Seasonality', 
-                    xy=(len(historical_data) + len(forecast_data)/2, np.mean(forecast_data.values)), 
-                    xytext=(len(historical_data) + len(forecast_data)/2, np.mean(forecast_data.values) + y_range*0.1),
-                    arrowprops=dict(arrowstyle='->', color='orange', alpha=0.7),
-                    fontsize=10, color='orange', weight='bold')
-    
-    if diagnostics['volatility_mismatch']['detected']:
-        ax1.annotate('Too Flat', 
-                    xy=(len(historical_data) + len(forecast_data)/3, min(forecast_data.values)), 
-                    xytext=(len(historical_data) + len(forecast_data)/3, min(forecast_data.values) - y_range*0.1),
-                    arrowprops=dict(arrowstyle='->', color='purple', alpha=0.7),
-                    fontsize=10, color='purple', weight='bold')
+    if detected_mask[:len(_ANNOTATION_SPECS)].any():
+        ymin, ymax = ax1.get_ylim()
+        y_range = ymax - ymin
+        
+        # Arrow anchors for each annotation; the text sits 10% of the y-range
+        # above (or, for "Too Flat", below) its anchor
+        anchors = np.array([[n_h/2, hist_max],
+                            [n_h + n_f/2, fcst_mean],
+                            [n_h + n_f/3, fcst_min]])
+        text_positions = anchors + np.array([[0, 1], [0, 1], [0, -1]]) * (y_range*0.1)
+        
+        for (_, text, color), xy, xytext, detected in zip(_ANNOTATION_SPECS, anchors, text_positions,
+                                                          detected_mask):
+            if detected:
+                ax1.annotate(text, 
+                            xy=xy, 
+                            xytext=xytext,
+                            arrowprops=dict(arrowstyle='->', color=color, alpha=0.7),
+                            fontsize=10, color=color, weight='bold')
     
     ax1.set_title(f'Forecast Analysis: {item_id}', fontsize=14, weight='bold')
     ax1.set_xlabel('Month')
     ax1.set_ylabel('Demand')
-    ax1.legend()
+    ax1.legend(handles=[
+        Line2D([], [], color='b', linestyle='-', linewidth=2, alpha=0.8, label='Historical'),
+        Line2D([], [], color='r', linestyle='--', linewidth=2, alpha=0.8, label='Forecast'),
+        forecast_start
+    ], loc='best')
     ax1.grid(True, alpha=0.3)
     
     # Issue summary subplot
-    issues = []
-    confidences = []
-    colors = []
-    
-    if diagnostics['trend_mismatch']['detected']:
-        issues.append('Trend\nMismatch')
-        confidences.append(diagnostics['trend_mismatch']['confidence'])
-        colors.append('red')
-    
-    if diagnostics['missing_seasonality']['detected']:
-        issues.append('Missing\nSeasonality')
-        confidences.append(diagnostics['missing_seasonality']['confidence'])
-        colors.append('orange')
-    
-    if diagnostics['volatility_mismatch']['detected']:
-        issues.append('Too Flat')
-        confidences.append(diagnostics['volatility_mismatch']['confidence'])
-        colors.append('purple')
-    
-    if diagnostics['magnitude_mismatch']['detected']:
-        issues.append('Magnitude\nMismatch')
-        confidences.append(diagnostics['magnitude_mismatch']['confidence'])
-        colors.append('brown')
-    
-    if issues:
-        bars = ax2.bar(issues, confidences, color=colors, alpha=0.7)
+    if detected_mask.any():
+        issues, confidences, colors = zip(*[(label, diagnostics[key]['confidence'], color)
+                                            for (key, label, color), detected in zip(_ISSUE_SPECS, detected_mask)
+                                            if detected])
+        bars = ax2.bar(issues, confidences, color=colors, alpha=0.7, rasterized=True)
         ax2.set_title('Issue Confidence Scores', fontsize=12)
         ax2.set_ylabel('Confidence')
         ax2.set_ylim(0, 1)
         
         # Add confidence values on bars
-        for bar, conf in zip(bars, confidences):
-            height = bar.get_height()
-            ax2.text(bar.get_x() + bar.get_width()/2., height + 0.02,
-                    f'{conf:.2f}', ha='center', va='bottom', fontsize=10)
+        ax2.bar_label(bars, labels=[f'{conf:.2f}' for conf in confidences], padding=3, fontsize=10)
     else:
         ax2.text(0.5, 0.5, 'No Issues Detected', ha='center', va='center', 
                 transform=ax2.transAxes, fontsize=14, color='green', weight='bold')
@@ -105,32 +201,131 @@ def plot_forecast_analysis(historical_data: pd.Series, forecast_data: pd.Series,
         ax2.set_ylim(0, 1)
         ax2.axis('off')
     
-    plt.tight_layout()
     return fig
 
 
+def _downsample(x: np.ndarray, y: np.ndarray,
+                max_points: int = _MAX_PLOT_POINTS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Min/max decimation for drawing long series: split y into buckets and
+    keep the lowest and highest point of each (plus both end points), in
+    their original order, so peaks and troughs survive.
+    """
+    n = y.size
+    if n <= max_points:
+        return x, y
+    
+    bucket_size = -(-n // (max_points // 2))
+    full = n // bucket_size * bucket_size
+    buckets = y[:full].reshape(-1, bucket_size)
+    starts = np.arange(0, full, bucket_size)
+    keep = [starts + buckets.argmin(axis=1), starts + buckets.argmax(axis=1), [0, n - 1]]
+    if full < n:
+        tail = y[full:]
+        keep.append([full + tail.argmin(), full + tail.argmax()])
+    
+    index = np.unique(np.concatenate(keep))
+    return x[index], y[index]
+
+
+def render_forecast_png(historical_data: pd.Series, forecast_data: pd.Series,
+                        diagnostics: Dict, item_id: str,
+                        figsize: Tuple[int, int] = (12, 8), dpi: int = 200,
+                        reuse_figure: bool = False) -> bytes:
+    """
+    Render the forecast analysis plot to PNG bytes and close the figure.
+    
+    With reuse_figure=True a single module-level figure is redrawn and kept
+    open instead (replaced when figsize changes), which is faster when
+    rendering many items from a single thread.
+    """
+    if reuse_figure:
+        fig = plot_forecast_analysis(historical_data, forecast_data, diagnostics, item_id, figsize,
+                                     fig=_get_reusable_fig(figsize))
+    else:
+        fig = plot_forecast_analysis(historical_data, forecast_data, diagnostics, item_id, figsize)
+    
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+    finally:
+        if not reuse_figure:
+            _get_plt().close(fig)
+    return buffer.getvalue()
+
+
+def _array_key(data: pd.Series) -> Tuple[bytes, str]:
+    """Hashable (raw bytes, dtype) key for a series or array."""
+    values = np.ascontiguousarray(_to_numpy(data))
+    return values.tobytes(), values.dtype.str
+
+
+def _to_numpy(data: pd.Series, dtype: Optional[np.dtype] = None) -> np.ndarray:
+    """
+    Values of a series or array as an ndarray, without copying when the
+    dtype already matches. Missing values of nullable dtypes become NaN.
+    """
+    if isinstance(data, pd.Series):
+        return data.to_numpy(dtype=dtype, na_value=np.nan)
+    return np.asarray(data, dtype=dtype)
+
+
+def _series_stats(values: np.ndarray) -> list:
+    """Mean, sample std, CV, min, max and trend slope of one series."""
+    # Imported here because loading numba and compiling the kernels takes
+    # longer than importing matplotlib, which is deferred for the same reason
+    from modules.diagnostics_jit import NUMBA_AVAILABLE, _series_stats_kernel
+    
+    if NUMBA_AVAILABLE:
+        return list(_series_stats_kernel(values))
+    
+    n = values.size
+    mean = values.mean()
+    # The deviations from the mean feed both the std and the slope
+    deviations = values - mean
+    std = np.sqrt((deviations @ deviations) / (n - 1))
+    
+    # Least-squares slope against the index; sum((x - x_mean)**2) for
+    # x = 0..n-1 is n(n^2 - 1)/12
+    x_centered = np.arange(n) - (n - 1) / 2
+    slope = (x_centered @ deviations) / (n * (n * n - 1) / 12)
+    
+    return [
+        mean,
+        std,
+        std / mean if mean != 0 else 0,
+        values.min(),
+        values.max(),
+        slope
+    ]
+
+
 def create_summary_stats_table(historical_data: pd.Series, forecast_data: pd.Series) -> pd.DataFrame:
     """
     Create a summary statistics table comparing historical and forecast data.
     """
+    # Convert each series once and reuse the array for every statistic
+    hist_vals = _to_numpy(historical_data, dtype=np.float64)
+    fcst_vals = _to_numpy(forecast_data, dtype=np.float64)
+    
     stats_data = {
         'Metric': ['Mean', 'Std Dev', 'CV', 'Min', 'Max', 'Trend Slope'],
-        'Historical': [
-            historical_data.mean(),
-            historical_data.std(),
-            historical_data.std() / historical_data.mean() if historical_data.mean() != 0 else 0,
-            historical_data.min(),
-            historical_data.max(),
-            np.polyfit(range(len(historical_data)), historical_data.values, 1)[0]
-        ],
-        'Forecast': [
-            forecast_data.mean(),
-            forecast_data.std(),
-            forecast_data.std() / forecast_data.mean() if forecast_data.mean() != 0 else 0,
-            forecast_data.min(),
-            forecast_data.max(),
-            np.polyfit(range(len(forecast_data)), forecast_data.values, 1)[0]
-        ]
+        'Historical': _series_stats(hist_vals),
+        'Forecast': _series_stats(fcst_vals)
     }
     
-    return pd.DataFrame(stats_data)
\ No newline at end of file
+    return pd.DataFrame(stats_data)
+
+
+def create_summary_stats_table_cached(historical_data: pd.Series, forecast_data: pd.Series) -> pd.DataFrame:
+    """
+    Memoized create_summary_stats_table: series with identical values return
+    a copy of the stored table.
+    """
+    return _summary_stats_table_memo(_array_key(historical_data), _array_key(forecast_data)).copy()
+
+
+@lru_cache(maxsize=256)
+def _summary_stats_table_memo(hist_key: Tuple[bytes, str], fcst_key: Tuple[bytes, str]) -> pd.DataFrame:
+    """Rebuild the arrays from their keys and build the table."""
+    return create_summary_stats_table(np.frombuffer(*hist_key), np.frombuffer(*fcst_key))
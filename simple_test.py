@@ -5,6 +5,7 @@ Simple test without complex dependencies to verify basic structure.
 # Create mock data to test the logic structure
 import sys
 import os
+import numpy as np
 sys.path.append('.')
 
 # Mock the pandas functionality for testing
@@ -12,6 +13,7 @@ class MockSeries:
     def __init__(self, data):
         self.data = data
         self.values = data
+        self._arr = np.asarray(data, dtype=np.float64)
     
     def __len__(self):
         return len(self.data)
@@ -26,18 +28,16 @@ class MockSeries:
         return self.data
     
     def mean(self):
-        return sum(self.data) / len(self.data)
+        return self._arr.mean()
     
     def std(self):
-        mean_val = self.mean()
-        variance = sum((x - mean_val) ** 2 for x in self.data) / len(self.data)
-        return variance ** 0.5
+        return self._arr.std(ddof=0)
     
     def min(self):
-        return min(self.data)
+        return self._arr.min()
     
     def max(self):
-        return max(self.data)
+        return self._arr.max()
 
 # Test basic diagnostic logic without pandas
 def test_basic_logic():
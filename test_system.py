@@ -2,9 +2,11 @@
 Test script for the forecast monitoring system.
 """
 import sys
+import numpy as np
 import pandas as pd
-from modules.loader import load_data, get_item_data, get_all_item_ids, get_recent_actuals, get_early_forecast
-from modules.diagnostics import run_all_diagnostics
+from modules.loader import (load_data, get_item_data, get_all_item_ids, get_recent_actuals, get_early_forecast,
+                            build_item_matrix)
+from modules.diagnostics import ISSUE_KEYS, run_all_diagnostics, run_all_diagnostics_matrix
 from modules.explainer import prepare_analysis_summary, generate_explanation
 
 
@@ -27,14 +29,14 @@ def test_system():
         historical_data, forecast_data = get_item_data(df, test_item)
         print(f"Historical data: {len(historical_data)} months")
         print(f"Forecast data: {len(forecast_data)} months")
-        print(f"Historical sample: {historical_data.head().tolist()}")
-        print(f"Forecast sample: {forecast_data.head().tolist()}")
+        print(f"Historical sample: {np.array2string(historical_data[:5], precision=2)}")
+        print(f"Forecast sample: {np.array2string(forecast_data[:5], precision=2)}")
         
         # Get recent actuals and early forecast
         recent_actuals = get_recent_actuals(historical_data)
         early_forecast = get_early_forecast(forecast_data)
-        print(f"Recent actuals: {recent_actuals.tolist()}")
-        print(f"Early forecast: {early_forecast.tolist()}")
+        print(f"Recent actuals: {np.array2string(recent_actuals, precision=2)}")
+        print(f"Early forecast: {np.array2string(early_forecast, precision=2)}")
         
         # Run diagnostics
         print("\nRunning diagnostics...")
@@ -53,6 +55,28 @@ def test_system():
         explanation = generate_explanation(analysis_summary, use_mock=True)
         print(f"Explanation: {explanation}")
         
+        # Run diagnostics for every item in one batch
+        print("\nRunning diagnostics for all items...")
+        item_index, hist_matrix, fcst_matrix = build_item_matrix(df)
+        all_results = run_all_diagnostics_matrix(hist_matrix, fcst_matrix)
+        # Items without history or forecast months have no diagnostics
+        all_diagnostics = {item_id: all_results[row] for item_id, row in item_index.items()
+                           if all_results[row] is not None}
+        print(f"Diagnosed {len(all_diagnostics)} of {len(item_index)} items")
+        
+        for issue_type in ISSUE_KEYS:
+            count = sum(1 for result in all_diagnostics.values() if result[issue_type]['detected'])
+            print(f"- {issue_type}: {count} items")
+        
+        top_item = max(all_diagnostics, key=lambda item_id: all_diagnostics[item_id]['summary']['risk_score'])
+        print(f"Highest risk item: {top_item} "
+              f"(risk score: {all_diagnostics[top_item]['summary']['risk_score']:.3f})")
+        
+        if test_item in all_diagnostics:
+            batch_risk = all_diagnostics[test_item]['summary']['risk_score']
+            assert abs(batch_risk - diagnostics['summary']['risk_score']) < 1e-6, \
+                f"Batch and single-item risk scores differ for {test_item}"
+        
         print("\nSystem test completed successfully!")
         return True
         